@@ -0,0 +1,143 @@
+"""Serial-port, packet and real-time helpers shared by fish.py, fish3.py and fish-osc.py."""
+import array
+import ctypes
+import ctypes.util
+import fcntl
+import os
+import sys
+import termios
+import time
+
+
+# ---------------------- Protocol 2.0 packets ----------------------
+PACKET_HEADER   = b"\xff\xff\xfd\x00"
+INST_SYNC_WRITE = 0x83
+BROADCAST_ID    = 0xFE
+
+def _crc16_table():
+    # CRC-16/IBM, polynomial 0x8005, as used by Dynamixel Protocol 2.0
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x8005) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return tuple(table)
+
+CRC16_TABLE = _crc16_table()
+
+def crc16(data, crc=0):
+    table = CRC16_TABLE
+    for b in data:
+        crc = ((crc << 8) ^ table[((crc >> 8) ^ b) & 0xFF]) & 0xFFFF
+    return crc
+
+
+# ---------------------- USB serial latency ----------------------
+def _latency_timer_path(port: str) -> str:
+    return f"/sys/bus/usb-serial/devices/{os.path.basename(os.path.realpath(port))}/latency_timer"
+
+def read_ftdi_latency(port: str):
+    """Current FTDI latency timer of `port` in ms, or None if it has none (non-FTDI, macOS)."""
+    try:
+        with open(_latency_timer_path(port)) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+def set_ftdi_latency(port: str, ms: int = 1) -> bool:
+    """Lower the FTDI USB latency timer (kernel default 16 ms) for `port` via sysfs.
+    Needs write access to the sysfs node (root or a udev rule)."""
+    try:
+        with open(_latency_timer_path(port), "w") as f:
+            f.write(str(ms))
+        return True
+    except OSError:
+        return False
+
+ASYNC_LOW_LATENCY = 1 << 13  # serial_struct.flags bit (linux/tty_flags.h)
+
+def set_async_low_latency(fd: int) -> bool:
+    """Set ASYNC_LOW_LATENCY on an open tty (what `setserial <port> low_latency` does);
+    for ftdi_sio this also drops the latency timer to 1 ms."""
+    try:
+        ss = array.array("i", [0] * 32)  # room for struct serial_struct; flags is the 5th int
+        fcntl.ioctl(fd, termios.TIOCGSERIAL, ss)
+        ss[4] |= ASYNC_LOW_LATENCY
+        fcntl.ioctl(fd, termios.TIOCSSERIAL, ss)
+        return True
+    except (AttributeError, OSError):  # non-Linux, or the driver doesn't support it
+        return False
+
+
+# ---------------------- Scheduling ----------------------
+def pin_thread(cpus, tid=0):
+    """Pin a thread (native id, 0 = caller) to a CPU set. Returns False if unsupported."""
+    if not cpus:
+        return False
+    try:
+        os.sched_setaffinity(tid, cpus)
+        return True
+    except (AttributeError, OSError):  # non-Linux, or CPU not present
+        return False
+
+def set_realtime_priority(priority: int) -> bool:
+    """Switch the calling thread to SCHED_FIFO. Returns False where unsupported/not permitted."""
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        return True
+    except (AttributeError, OSError):  # non-Linux, or missing CAP_SYS_NICE
+        return False
+
+
+# ---------------------- libc timing ----------------------
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+CLOCK_MONOTONIC = 1  # same clock as time.monotonic_ns() on Linux
+TIMER_ABSTIME   = 1
+EINTR           = 4
+
+PR_SET_TIMERSLACK = 29
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+
+def _load_clock_nanosleep(libc):
+    try:
+        fn = libc.clock_nanosleep
+    except AttributeError:  # no libc / no clock_nanosleep (macOS)
+        return None
+    fn.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.POINTER(_Timespec), ctypes.c_void_p]
+    fn.restype = ctypes.c_int
+    return fn
+
+libc = _load_libc()  # None off Linux
+_clock_nanosleep = _load_clock_nanosleep(libc)
+
+def set_timer_slack(ns=1):
+    """Shrink the calling thread's timer slack (50 us by default) so timed sleeps
+    wake on the deadline instead of up to 50 us late. Returns False where unsupported."""
+    if libc is None:
+        return False
+    try:
+        return libc.prctl(PR_SET_TIMERSLACK, ctypes.c_ulong(ns), 0, 0, 0) == 0
+    except AttributeError:
+        return False
+
+def sleep_until(deadline_ns: int):
+    """Sleep until a time.monotonic_ns() deadline. On Linux this is one absolute
+    clock_nanosleep, so the wake-up isn't stretched by the time spent computing the delay."""
+    if _clock_nanosleep is None:
+        remain = deadline_ns - time.monotonic_ns()
+        if remain > 0:
+            time.sleep(remain / 1e9)
+        return
+    ts = _Timespec(*divmod(deadline_ns, 1_000_000_000))
+    while _clock_nanosleep(CLOCK_MONOTONIC, TIMER_ABSTIME, ctypes.byref(ts), None) == EINTR:
+        pass
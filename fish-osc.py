@@ -2,19 +2,36 @@ import time
 import math
 import threading
 import argparse
+import array
+import collections
 import os
 import json
+import logging
+import logging.handlers
+import queue
+import selectors
 import socket
+import struct
+import subprocess
 import sys
-import tkinter as tk
-from tkinter import ttk, messagebox
-from dynamixel_sdk import *  # Dynamixel SDK
+from dynamixel_sdk import PortHandler, PacketHandler, COMM_SUCCESS
+from dxl_port import (BROADCAST_ID, INST_SYNC_WRITE, PACKET_HEADER, crc16, libc, pin_thread,
+                      read_ftdi_latency, set_async_low_latency, set_ftdi_latency,
+                      set_realtime_priority, set_timer_slack, sleep_until)
 from pythonosc import dispatcher as osc_dispatcher
-from pythonosc import osc_server
+try:
+    import orjson  # optional, much faster settings.json writes
+except ImportError:
+    orjson = None
 
 # ==================== USER / HW SETTINGS ====================
 PORT = "/dev/ttyUSB0"        # U2D2/USB adapter on Pi
+# XL430 ships at 57600, where a goal packet alone takes ~3 ms on the wire; it supports up
+# to 4.5 Mbps. To go faster, set the motor's baud rate (DYNAMIXEL Wizard) first, then
+# record it in settings.json "motor.baudrate". If the motor doesn't answer a ping at the
+# configured rate we fall back to FACTORY_BAUDRATE.
 BAUDRATE = 57600
+FACTORY_BAUDRATE = 57600
 PROTOCOL_VERSION = 2.0
 MOTOR_ID = 1
 
@@ -39,29 +56,85 @@ ADDR_PRESENT_POSITION     = 132  # 4B
 ADDR_PROFILE_ACCELERATION = 108  # 4B
 ADDR_PROFILE_VELOCITY     = 112  # 4B
 ADDR_VELOCITY_LIMIT       = 44   # 4B
+ADDR_RETURN_DELAY_TIME    = 9    # 1B, EEPROM (2 µs/unit, factory default 250 = 500 µs)
 TORQUE_ENABLE             = 1
 TORQUE_DISABLE            = 0
 
+# Protocol 2.0 SyncWrite of GOAL_POSITION for one motor, built once and patched per tick:
+# FF FF FD 00 | FE | LEN=12 | 83 | addr(2) | data len(2) | id | position(4) | CRC(2)
+GOAL_PKT_POS_OFFSET = 13
+GOAL_PKT_CRC_OFFSET = 17
+
 # Safe-ish caps — tune for your linkage
 VEL_LIMIT_UNITS  = 300   # ~0.229 rpm/unit -> 300 ~ 68.7 rpm ~ 412 deg/s
 PROF_VEL_UNITS   = 300
 PROF_ACC_UNITS   = 1000
+VELOCITY_UNIT_DPS = 0.229 * 6  # one Profile Velocity unit (0.229 rpm) in deg/s
+
+# True: per half-swing send only the end point plus a Profile Velocity that covers it in
+# the same time, and let the servo's profile generator interpolate (trapezoidal, not a
+# true sine; ~2 writes per swing instead of loop_hz). False: stream the waveform.
+PROFILE_MODE = False
 
 # OSC defaults
 DEFAULT_OSC_IP   = "0.0.0.0"
 DEFAULT_OSC_PORT = 8000
+OSC_MAX_DATAGRAM = 65535
+OSC_SOCKBUF_BYTES = 1 << 20  # absorb slider bursts without kernel-side drops
+                             # (Linux caps this at net.core.rmem_max / wmem_max)
+
+# CPU affinity — keep the motor loop and the OSC server on different cores.
+# settings.json "motor.cpus" (hand-edited; never written from --motor-cpus) overrides the
+# motor default. For the tightest timing also
+# take that core away from the kernel scheduler by appending to /boot/firmware/cmdline.txt:
+#   isolcpus=1 nohz_full=1 rcu_nocbs=1
+DEFAULT_MOTOR_CPUS = "1"
+DEFAULT_OSC_CPUS   = "0"
+# SCHED_FIFO priority for the motor loop. Needs root or an rtprio limit, e.g.
+# "pi - rtprio 99" in /etc/security/limits.conf; stays SCHED_OTHER otherwise.
+RT_PRIORITY = 20
+
+# GUI log pane: the Tk main loop polls a ring buffer of GUI_LOG_RING lines every
+# GUI_LOG_FLUSH_MS and inserts them in one go; once the pane passes GUI_LOG_MAX_LINES
+# the oldest lines are dropped so it ends GUI_LOG_TRIM_LINES under
+GUI_LOG_FLUSH_MS   = 100
+GUI_LOG_RING       = 200
+GUI_LOG_MAX_LINES  = 2000
+GUI_LOG_TRIM_LINES = 500
+
+WAVE_REBUILD_INTERVAL = 0.05  # seconds; caps waveform rebuilds at 20/s
 
 SETTINGS_FILE = "settings.json"
+SETTINGS_WRITE_DELAY = 0.25   # seconds to coalesce a burst of saves into one write
 # ============================================================
 
 
 # -------------------------- Helpers --------------------------
+log = logging.getLogger("fish-osc")
+
+def setup_logging(level: str = "INFO") -> logging.handlers.QueueListener:
+    """Send log records through a queue so stdout writes happen on the listener thread,
+    not on the OSC dispatcher or motor loop."""
+    q = queue.SimpleQueue()
+    out = logging.StreamHandler(sys.stdout)
+    out.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S"))
+    listener = logging.handlers.QueueListener(q, out)
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(q))
+    root.setLevel(level.upper())
+    listener.start()
+    return listener
+
+_DEG2U = 4095.0 / 360.0  # DXL position units per degree
+_U2DEG = 360.0 / 4095.0
+
 def degrees_to_dxl_units(deg: float) -> int:
-    d = (deg % 360.0)
-    return int(d / 360.0 * 4095.0)
+    return int((deg % 360.0) * _DEG2U)
 
 def dxl_units_to_degrees(units: int) -> float:
-    return (units / 4095.0) * 360.0
+    return units * _U2DEG
+
+HOME_UNITS = degrees_to_dxl_units(HOME_DEGREES)
 
 def clamp_0_4095(x: int) -> int:
     return 0 if x < 0 else (4095 if x > 4095 else x)
@@ -73,37 +146,150 @@ def speed_deg_per_sec(elapsed: float, period_sec: float, vmin: float, vmax: floa
     phi = 2.0 * math.pi * (elapsed / period_sec)
     return vmin + (vmax - vmin) * 0.5 * (1.0 - math.cos(phi))
 
+def goal_packet_template(motor_id: int) -> bytearray:
+    """SyncWrite GOAL_POSITION packet for one motor; position and CRC are patched per send."""
+    return bytearray(struct.pack("<4sBHBHHB4xH", PACKET_HEADER, BROADCAST_ID, 12,
+                                 INST_SYNC_WRITE, ADDR_GOAL_POSITION, 4, motor_id, 0))
+
+def build_waveform(amplitude: float, vmin: float, vmax: float, period_sec: float, loop_dt: float) -> list:
+    """Goal positions (DXL units) for one sweep, one per control tick: the phase is
+    integrated once here, so the motor loop only indexes the list."""
+    amp_deg = max(amplitude, 0.1)
+    phase = 0.0
+    wave = []
+    for k in range(math.ceil(period_sec / loop_dt)):
+        v_dps = speed_deg_per_sec(k * loop_dt, period_sec, vmin, vmax)
+        phase += v_dps / amp_deg * loop_dt   # θ=A·sin(phase) → peak dθ/dt=A·dphase/dt
+        wave.append(clamp_0_4095(degrees_to_dxl_units(HOME_DEGREES + amplitude * math.sin(phase))))
+    return wave
+
+def profile_moves(wave: list, loop_dt: float) -> list:
+    """PROFILE_MODE: collapse a sweep into its half-swings as (end goal units, Profile
+    Velocity units, duration s), keeping each swing's timing from the streamed waveform."""
+    moves = []
+    start = 0
+    direction = 0
+    def close(end):
+        dur = (end - start) * loop_dt
+        dist_deg = abs(wave[end] - wave[start]) * _U2DEG
+        if dur > 0 and dist_deg > 0:
+            vel = math.ceil(dist_deg / dur / VELOCITY_UNIT_DPS)
+            moves.append((wave[end], min(max(vel, 1), VEL_LIMIT_UNITS), dur))
+    for k in range(1, len(wave)):
+        step = wave[k] - wave[k - 1]
+        if step == 0:
+            continue
+        d = 1 if step > 0 else -1
+        if direction and d != direction:  # turned around at the previous sample
+            close(k - 1)
+            start = k - 1
+        direction = d
+    close(len(wave) - 1)
+    return moves
+
+def parse_cpu_list(text):
+    """'0,2' -> {0, 2}; empty string -> None (leave affinity alone)."""
+    cpus = {int(c) for c in str(text).split(",") if c.strip()}
+    return cpus or None
+
+LINUX_REBOOT_CMD_POWER_OFF = 0x4321FEDC
+
+def power_off():
+    """Last resort: power off with reboot(2) after syncing filesystems. Skips systemd's
+    orderly shutdown (no service stop, no unmount), so only use it when that fails.
+    Needs CAP_SYS_BOOT; returns False (machine still up) without it."""
+    if libc is None:
+        return False
+    os.sync()
+    return libc.reboot(LINUX_REBOOT_CMD_POWER_OFF) == 0
+
+# tkinter is imported on first GUI use, so the headless service never loads Tk
+tk = ttk = messagebox = None
+
+def load_tk():
+    global tk, ttk, messagebox
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+
 def is_display_connected():
-    try:
-        if not os.environ.get("DISPLAY"):
-            return False
+    display = os.environ.get("DISPLAY")
+    if not display:
+        return False
+    host, _, screen = display.rpartition(":")
+    if host in ("", "unix"):
+        # Local X server: check its socket instead of bringing up Tk; if Tk still
+        # can't connect (e.g. no xhost access), main falls back to headless
+        return os.path.exists(f"/tmp/.X11-unix/X{screen.split('.')[0]}")
+    try:  # remote/forwarded display: actually try opening it
+        load_tk()
         t = tk.Tk(); t.withdraw(); t.destroy()
         return True
     except Exception:
         return False
 
 
+class ExactDispatcher(osc_dispatcher.Dispatcher):
+    """Dispatcher for our fixed addresses: one dict lookup per message instead of
+    pattern-matching against every mapped address. Wildcard patterns still fall back."""
+    def handlers_for_address(self, address_pattern):
+        handlers = self._map.get(address_pattern)
+        if handlers:
+            yield from handlers
+        else:
+            yield from super().handlers_for_address(address_pattern)
+
+
 # ----------------------- Config helpers ----------------------
+# Parsed settings.json keyed by its mtime, so main() and the oscillator share one parse.
+# Treat the returned dict as read-only.
+_config_cache = (None, None)
+
 def load_config():
-    if not os.path.exists(SETTINGS_FILE):
+    global _config_cache
+    try:
+        mtime = os.stat(SETTINGS_FILE).st_mtime_ns
+    except OSError:
         return None
+    if _config_cache[0] == mtime:
+        return _config_cache[1]
     try:
-        with open(SETTINGS_FILE, "r") as f:
-            return json.load(f)
+        with open(SETTINGS_FILE, "rb") as f:
+            data = f.read()
+        cfg = orjson.loads(data) if orjson is not None else json.loads(data)
     except Exception:
         return None
+    _config_cache = (mtime, cfg)
+    return cfg
 
-def save_config(listen_ip, listen_port, motion_dict):
-    cfg = {
+def build_config(listen_ip, listen_port, motion_dict, baudrate=BAUDRATE, motor_cpus=None):
+    return {
         "osc": {"listen_ip": listen_ip, "listen_port": listen_port},
         "motor": {
-            "port": PORT, "baudrate": BAUDRATE,
-            "motor_id": MOTOR_ID, "home_degrees": HOME_DEGREES
+            "port": PORT, "baudrate": baudrate,
+            "motor_id": MOTOR_ID, "home_degrees": HOME_DEGREES,
+            **({} if motor_cpus is None else {"cpus": sorted(motor_cpus)})
         },
         "motion": motion_dict
     }
-    with open(SETTINGS_FILE, "w") as f:
-        json.dump(cfg, f, indent=4)
+
+def save_config(listen_ip, listen_port, motion_dict, durable=False, baudrate=BAUDRATE, motor_cpus=None):
+    global _config_cache
+    cfg = build_config(listen_ip, listen_port, motion_dict, baudrate, motor_cpus)
+    if orjson is not None:
+        data = orjson.dumps(cfg, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(cfg, indent=2).encode()
+    # Write-then-rename so a power cut mid-write can't leave a torn settings.json.
+    # fsync only when asked (explicit saves, shutdown): auto-saves shouldn't stall on the SD card.
+    tmp = SETTINGS_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, SETTINGS_FILE)
+    _config_cache = (os.stat(SETTINGS_FILE).st_mtime_ns, cfg)
+    return cfg
 
 def merge_motion_defaults(existing):
     m = dict(DEFAULTS_MOTION)
@@ -116,15 +302,22 @@ def merge_motion_defaults(existing):
 
 # ---------------------- Main controller ----------------------
 class SingleMotorOscillator:
-    def __init__(self, root, osc_ip, osc_port, auto_start=True):
+    def __init__(self, root, osc_ip, osc_port, auto_start=True, motor_cpus=None, osc_cpus=None,
+                 log_listener=None):
         self.root = root
+        self.log_listener = log_listener
         self.has_gui = root is not None
         self.auto_start = auto_start
+        self.motor_cpus = motor_cpus
+        self.osc_cpus = osc_cpus
 
         cfg = load_config() or {}
         osc_cfg = cfg.get("osc", {})
         self.osc_ip = osc_ip if osc_ip is not None else osc_cfg.get("listen_ip", DEFAULT_OSC_IP)
         self.osc_port = int(osc_port if osc_port is not None else osc_cfg.get("listen_port", DEFAULT_OSC_PORT))
+        self.baudrate = int(cfg.get("motor", {}).get("baudrate", BAUDRATE))
+        # Persisted as read: --motor-cpus is a runtime override, not a new default
+        self._saved_motor_cpus = cfg.get("motor", {}).get("cpus")
 
         motion_cfg = merge_motion_defaults(cfg.get("motion"))
         self.amplitude_deg  = float(motion_cfg["amplitude_deg"])
@@ -135,38 +328,78 @@ class SingleMotorOscillator:
         self.sleep_after_s  = float(motion_cfg["sleep_after_period_sec"])
         self.sleep_at_center = bool(motion_cfg["sleep_at_center"])
         self.disable_torque_during_sleep = bool(motion_cfg["disable_torque_during_sleep"])
-
-        # Persist normalized config
-        save_config(self.osc_ip, self.osc_port, {
-            "amplitude_deg": self.amplitude_deg,
-            "min_speed_dps": self.min_speed_dps,
-            "max_speed_dps": self.max_speed_dps,
-            "period_sec": self.period_sec,
-            "loop_hz": self.loop_hz,
-            "sleep_after_period_sec": self.sleep_after_s,
-            "sleep_at_center": self.sleep_at_center,
-            "disable_torque_during_sleep": self.disable_torque_during_sleep
-        })
+        self._param_lock = threading.Lock()   # guards the motion parameters above
+
+        # Persist normalized config — skipped when settings.json already matches,
+        # so a normal boot doesn't rewrite the SD card
+        self._config = cfg
+        if build_config(self.osc_ip, self.osc_port, self._motion_settings(), self.baudrate,
+                        self._saved_motor_cpus) != self._config:
+            self._config = save_config(self.osc_ip, self.osc_port, self._motion_settings(),
+                                       baudrate=self.baudrate, motor_cpus=self._saved_motor_cpus)
+
+        # Background settings writer (see save_settings)
+        self._save_pending = False
+        self._save_lock = threading.Lock()
+        self._save_evt = threading.Event()
+        threading.Thread(target=self._settings_writer, daemon=True).start()
 
         # DXL setup
+        self._goal_pkt = goal_packet_template(MOTOR_ID)
         self.port_handler = PortHandler(PORT)
         self.packet_handler = PacketHandler(PROTOCOL_VERSION)
         if not self.port_handler.openPort():
             raise RuntimeError(f"Failed to open port {PORT}")
-        if not self.port_handler.setBaudRate(BAUDRATE):
-            raise RuntimeError(f"Failed to set baudrate {BAUDRATE}")
-
+        if not self.port_handler.setBaudRate(self.baudrate):
+            raise RuntimeError(f"Failed to set baudrate {self.baudrate}")
+        # SyncWrite is a broadcast, so a rate mismatch would otherwise fail silently
+        link_baudrate = self.baudrate
+        _, ping_comm, _ = self.packet_handler.ping(self.port_handler, MOTOR_ID)
+        if ping_comm != COMM_SUCCESS and self.baudrate != FACTORY_BAUDRATE:
+            if not self.port_handler.setBaudRate(FACTORY_BAUDRATE):
+                raise RuntimeError(f"Failed to set baudrate {FACTORY_BAUDRATE}")
+            link_baudrate = FACTORY_BAUDRATE
+            _, ping_comm, _ = self.packet_handler.ping(self.port_handler, MOTOR_ID)
+        # Try both: sysfs needs write access to the node, the ioctl needs driver support
+        latency_before = read_ftdi_latency(PORT)
+        low_latency = set_ftdi_latency(PORT) | set_async_low_latency(self.port_handler.ser.fileno())
+        latency_after = read_ftdi_latency(PORT)
+
+        # Return Delay Time and Velocity Limit are EEPROM: they persist in the motor, so only
+        # write them when they differ (spares EEPROM wear on every boot), and with torque off
+        # as EEPROM writes require (it may still be on if the last run didn't clean up)
+        ph, port = self.packet_handler, self.port_handler
+        rdt, rdt_comm, _ = ph.read1ByteTxRx(port, MOTOR_ID, ADDR_RETURN_DELAY_TIME)
+        vel, vel_comm, _ = ph.read4ByteTxRx(port, MOTOR_ID, ADDR_VELOCITY_LIMIT)
+        rdt_stale = rdt_comm != COMM_SUCCESS or rdt != 0
+        vel_stale = vel_comm != COMM_SUCCESS or vel != VEL_LIMIT_UNITS
+        if rdt_stale or vel_stale:
+            ph.write1ByteTxRx(port, MOTOR_ID, ADDR_TORQUE_ENABLE, TORQUE_DISABLE)
+            if rdt_stale:
+                ph.write1ByteTxRx(port, MOTOR_ID, ADDR_RETURN_DELAY_TIME, 0)
+            if vel_stale:
+                ph.write4ByteTxRx(port, MOTOR_ID, ADDR_VELOCITY_LIMIT, VEL_LIMIT_UNITS)
         self.packet_handler.write1ByteTxRx(self.port_handler, MOTOR_ID, ADDR_TORQUE_ENABLE, TORQUE_ENABLE)
         self._assert_motion_caps()
 
-        self.zero_pos = degrees_to_dxl_units(HOME_DEGREES)
+        self.zero_pos = HOME_UNITS
         self._goto_units(self.zero_pos)
         time.sleep(0.2)
 
         self.running = False
         self._stop_evt = threading.Event()
+        # Same state as _stop_evt as a single byte: the per-tick check is one subscript
+        # instead of a method call; the Event stays for the blocking waits
+        self._stop_flag = array.array("b", [0])
         self._thread = None
 
+        # Waveform builder: parameter changes are turned into the next sweep's goal table
+        # here, off the real-time motor thread, and published as one reference swap
+        self._wave_ref = [None]   # [(key, wave)]; replaced whole, never mutated
+        self._wave_req = queue.SimpleQueue()
+        threading.Thread(target=self._waveform_worker, daemon=True).start()
+        self._wave_req.put(None)
+
         # GUI
         if self.has_gui:
             self._setup_gui()
@@ -174,12 +407,30 @@ class SingleMotorOscillator:
         # OSC
         self.dispatcher = None
         self.osc_server = None
+        self._osc_q = queue.SimpleQueue()
+        worker = threading.Thread(target=self._osc_worker, daemon=True)
+        worker.start()
+        pin_thread(self.osc_cpus, worker.native_id)
         self._start_osc_server(self.osc_ip, self.osc_port)
 
+        if link_baudrate != self.baudrate:
+            self._log(f"Motor {MOTOR_ID} did not answer at {self.baudrate} bps; "
+                      f"using {FACTORY_BAUDRATE} bps", logging.WARNING)
+        else:
+            self._log(f"{PORT} at {link_baudrate} bps")
+        if ping_comm != COMM_SUCCESS:
+            self._log(f"Motor {MOTOR_ID} did not answer a ping at {link_baudrate} bps: "
+                      f"{self.packet_handler.getTxRxResult(ping_comm)}", logging.WARNING)
+        if latency_before is not None:
+            self._log(f"{PORT} latency_timer {latency_before} ms -> {latency_after} ms")
+        if not low_latency:
+            self._log(f"Could not put {PORT} in low-latency mode; serial round-trips stay at ~16 ms. "
+                      f"Run 'setserial {PORT} low_latency' as root, or add a udev rule.", logging.WARNING)
         self._log(f"Ready. amp={self.amplitude_deg}°, min={self.min_speed_dps}°/s, "
                   f"max={self.max_speed_dps}°/s, T={self.period_sec}s, loop={self.loop_hz}Hz, "
                   f"sleep={self.sleep_after_s}s, center={self.sleep_at_center}, "
-                  f"cut_torque={self.disable_torque_during_sleep}, OSC={self.osc_ip}:{self.osc_port}")
+                  f"cut_torque={self.disable_torque_during_sleep}, OSC={self.osc_ip}:{self.osc_port} "
+                  f"(/fish/set amp [min max period] updates several at once)")
 
         # AUTOSTART: schedule after UI/OSC are live
         if self.auto_start and not self.running:
@@ -190,13 +441,21 @@ class SingleMotorOscillator:
 
     # ----------------- Low-level actions -----------------
     def _goto_units(self, units: int):
-        self.packet_handler.write4ByteTxRx(self.port_handler, MOTOR_ID, ADDR_GOAL_POSITION, clamp_0_4095(units))
+        # Broadcast SyncWrite: the motor sends no status packet, so there is no round-trip
+        # to wait for and no stale reply left on the bus. Only the position and CRC of the
+        # pre-built packet change, so skip the SDK's per-call packet assembly.
+        pkt = self._goal_pkt
+        struct.pack_into("<i", pkt, GOAL_PKT_POS_OFFSET, clamp_0_4095(units))
+        struct.pack_into("<H", pkt, GOAL_PKT_CRC_OFFSET, crc16(memoryview(pkt)[:GOAL_PKT_CRC_OFFSET]))
+        self.port_handler.writePort(pkt)
 
     def _assert_motion_caps(self):
+        # Profile Acceleration (108) and Profile Velocity (112) are adjacent RAM registers:
+        # one 8-byte write, one status round-trip. Velocity Limit is EEPROM and is set at
+        # startup while torque is off (writing it with torque on is rejected).
         try:
-            self.packet_handler.write4ByteTxRx(self.port_handler, MOTOR_ID, ADDR_VELOCITY_LIMIT, VEL_LIMIT_UNITS)
-            self.packet_handler.write4ByteTxRx(self.port_handler, MOTOR_ID, ADDR_PROFILE_VELOCITY, PROF_VEL_UNITS)
-            self.packet_handler.write4ByteTxRx(self.port_handler, MOTOR_ID, ADDR_PROFILE_ACCELERATION, PROF_ACC_UNITS)
+            self.packet_handler.writeTxRx(self.port_handler, MOTOR_ID, ADDR_PROFILE_ACCELERATION, 8,
+                                          list(struct.pack("<II", PROF_ACC_UNITS, PROF_VEL_UNITS)))
         except Exception:
             pass
 
@@ -252,65 +511,138 @@ class SingleMotorOscillator:
         ttk.Button(btns, text="Home",  command=self.go_home_gui).grid(row=0, column=2, padx=4)
         ttk.Button(btns, text="Save",  command=self.save_settings_gui).grid(row=0, column=3, padx=4)
 
+        self._log_buf = collections.deque(maxlen=GUI_LOG_RING)
         self.log_text = tk.Text(frame, height=12, width=74)
         self.log_text.grid(row=r, column=0, columnspan=2, sticky="nsew")
+        root.after(GUI_LOG_FLUSH_MS, self._flush_log)
 
         root.columnconfigure(0, weight=1)
         root.rowconfigure(0, weight=1)
         frame.columnconfigure(1, weight=1)
 
-    def _log(self, msg: str):
-        ts = time.strftime("%H:%M:%S")
-        line = f"[{ts}] {msg}"
-        print(line)
+    def _log(self, msg: str, level: int = logging.INFO):
+        log.log(level, msg)
         if self.has_gui and hasattr(self, "log_text"):
-            self.log_text.insert(tk.END, line + "\n")
-            self.log_text.see(tk.END)
-            self.root.update_idletasks()
+            # Callers may be the OSC or motor thread: only touch the deque here; the Tk
+            # main loop picks lines up in _flush_log, so no Tk call crosses threads
+            self._log_buf.append(f"[{time.strftime('%H:%M:%S')}] {msg}\n")
+
+    def _flush_log(self):
+        self.root.after(GUI_LOG_FLUSH_MS, self._flush_log)
+        if not self._log_buf:
+            return
+        lines = []
+        while self._log_buf:
+            lines.append(self._log_buf.popleft())
+        self.log_text.insert(tk.END, "".join(lines))
+        last = int(self.log_text.index("end-1c").split(".")[0])
+        if last > GUI_LOG_MAX_LINES:
+            self.log_text.delete("1.0", f"{last - GUI_LOG_MAX_LINES + GUI_LOG_TRIM_LINES}.0")
+        self.log_text.see(tk.END)
 
     # ----------------- OSC server lifecycle -----------------
     def _setup_osc_handlers(self):
-        d = self.dispatcher
-        d.map("/fish/start",  self.start_oscillation)
-        d.map("/fish/stop",   self.stop_oscillation)
-        d.map("/fish/home",   self.go_home)
-        d.map("/fish/angle",  self.set_angle)
-        d.map("/fish/status", self.send_status)
-        d.map("/fish/shutdown", self.shutdown_system)
-
-        d.map("/fish/amplitude", self.osc_set_amplitude)
-        d.map("/fish/min_speed", self.osc_set_min_speed)
-        d.map("/fish/max_speed", self.osc_set_max_speed)
-        d.map("/fish/period",    self.osc_set_period)
-        d.map("/fish/loop_hz",   self.osc_set_loop_hz)
-        d.map("/fish/sleep_after", self.osc_set_sleep_after)
-        d.map("/fish/sleep_at_center", self.osc_set_sleep_at_center)
-        d.map("/fish/disable_torque_during_sleep", self.osc_set_disable_torque)
-        d.map("/fish/save", self.osc_save)
+        def route(address, handler):
+            # The receiver thread only enqueues; handlers run on the OSC worker thread,
+            # so a slow handler (stop joins the motor thread) never stalls reception
+            self.dispatcher.map(address, lambda addr, *args: self._osc_q.put((handler, addr, args)))
+
+        route("/fish/start",  self.start_oscillation)
+        route("/fish/stop",   self.stop_oscillation)
+        route("/fish/home",   self.go_home)
+        route("/fish/angle",  self.set_angle)
+        route("/fish/status", self.send_status)
+        route("/fish/shutdown", self.shutdown_system)
+
+        route("/fish/amplitude", self.osc_set_amplitude)
+        route("/fish/min_speed", self.osc_set_min_speed)
+        route("/fish/max_speed", self.osc_set_max_speed)
+        route("/fish/period",    self.osc_set_period)
+        route("/fish/loop_hz",   self.osc_set_loop_hz)
+        route("/fish/sleep_after", self.osc_set_sleep_after)
+        route("/fish/sleep_at_center", self.osc_set_sleep_at_center)
+        route("/fish/disable_torque_during_sleep", self.osc_set_disable_torque)
+        route("/fish/save", self.osc_save)
+        route("/fish/set", self.osc_set_params)
+
+    def _osc_worker(self):
+        while True:
+            handler, addr, args = self._osc_q.get()
+            try:
+                handler(addr, *args)
+            except Exception as e:
+                self._log(f"[OSC] {addr} failed: {e}")
 
     def _start_osc_server(self, ip, port):
         # Shutdown any existing server
         self._stop_osc_server()
 
         # Fresh dispatcher
-        self.dispatcher = osc_dispatcher.Dispatcher()
+        self.dispatcher = ExactDispatcher()
         self._setup_osc_handlers()
 
         try:
-            self.osc_server = osc_server.ThreadingOSCUDPServer((ip, int(port)), self.dispatcher)
-            threading.Thread(target=self.osc_server.serve_forever, daemon=True).start()
+            # One receiver thread instead of a new thread per datagram
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                self._tune_osc_socket(sock)
+                sock.bind((ip, int(port)))
+            except Exception:
+                sock.close()
+                raise
+            self.osc_server = sock
+            t = threading.Thread(target=self._osc_receive, args=(sock, self.dispatcher), daemon=True)
+            t.start()
+            self._osc_thread = t
+            if pin_thread(self.osc_cpus, t.native_id):
+                self._log(f"[OSC] Server pinned to CPUs {sorted(self.osc_cpus)}")
             self._log(f"[OSC] Listening on {ip}:{port}")
         except Exception as e:
             self.osc_server = None
             self._log(f"[OSC] Failed to bind {ip}:{port} — {e}")
 
+    def _osc_receive(self, sock, dispatcher):
+        # Non-blocking socket behind a selector: each wake-up drains every queued datagram
+        # straight into the dispatcher, so a controller burst costs one wait, not one per
+        # packet, and there is no socketserver request-handler object per datagram
+        sock.setblocking(False)
+        recv = sock.recvfrom
+        handle = dispatcher.call_handlers_for_packet
+        with selectors.DefaultSelector() as sel:
+            sel.register(sock, selectors.EVENT_READ)
+            while True:
+                sel.select()
+                if self.osc_server is not sock:
+                    return  # woken by shutdown() in _stop_osc_server
+                while True:
+                    try:
+                        data, client = recv(OSC_MAX_DATAGRAM)
+                    except BlockingIOError:
+                        break
+                    except OSError:
+                        return
+                    handle(data, client)
+
+    def _tune_osc_socket(self, sock):
+        for opt, name in ((socket.SO_RCVBUF, "rcvbuf"), (socket.SO_SNDBUF, "sndbuf")):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, opt, OSC_SOCKBUF_BYTES)
+            except OSError:
+                pass
+        self._log(f"[OSC] Socket buffers rcvbuf={sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)} "
+                  f"sndbuf={sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)} bytes")
+
     def _stop_osc_server(self):
-        if self.osc_server:
+        sock, self.osc_server = self.osc_server, None
+        if sock:
             try:
-                self.osc_server.shutdown()
-            except Exception:
+                sock.shutdown(socket.SHUT_RDWR)  # makes the socket readable: wakes select()
+            except OSError:
                 pass
-            self.osc_server = None
+            # Let the receiver see it before closing: closing drops the fd from the
+            # selector, and select() would then never return
+            self._osc_thread.join(timeout=1.0)
+            sock.close()
 
     # GUI action: apply new OSC IP/Port
     def apply_osc_settings(self):
@@ -329,98 +661,181 @@ class SingleMotorOscillator:
             messagebox.showerror("OSC", f"Failed to apply OSC settings: {e}")
 
     # ------------------- OSC setters -------------------
+    def _set_params(self, **params):
+        # Cheap for the OSC thread: just assign under the lock the motor loop snapshots with.
+        # Controllers re-send unchanged values constantly; those don't wake the builder.
+        with self._param_lock:
+            changed = {n: v for n, v in params.items() if getattr(self, n) != v}
+            for name, value in changed.items():
+                setattr(self, name, value)
+        if changed:
+            self._wave_req.put(None)
+
+    def _wave_key(self):
+        # Caller holds _param_lock
+        return (self.amplitude_deg, self.min_speed_dps, self.max_speed_dps,
+                self.period_sec, 1.0 / max(self.loop_hz, 1.0))
+
+    def _waveform_worker(self):
+        while True:
+            self._wave_req.get()
+            time.sleep(WAVE_REBUILD_INTERVAL)  # rebuild at most this often during a slider drag
+            while not self._wave_req.empty():  # a slider burst needs only the latest values
+                self._wave_req.get()
+            with self._param_lock:
+                key = self._wave_key()
+            ref = self._wave_ref[0]
+            if ref is None or ref[0] != key:
+                self._wave_ref[0] = (key, build_waveform(*key))
+
     def osc_set_amplitude(self, addr, value):
-        try: self.amplitude_deg = max(0.1, float(value)); self._log(f"Amplitude={self.amplitude_deg} deg")
+        try: self._set_params(amplitude_deg=max(0.1, float(value))); self._log(f"Amplitude={self.amplitude_deg} deg", logging.DEBUG)
         except: self._log("Invalid amplitude")
 
     def osc_set_min_speed(self, addr, value):
-        try: self.min_speed_dps = max(0.1, float(value)); self._log(f"Min speed={self.min_speed_dps} deg/s")
+        try: self._set_params(min_speed_dps=max(0.1, float(value))); self._log(f"Min speed={self.min_speed_dps} deg/s", logging.DEBUG)
         except: self._log("Invalid min speed")
 
     def osc_set_max_speed(self, addr, value):
-        try: self.max_speed_dps = max(0.1, float(value)); self._log(f"Max speed={self.max_speed_dps} deg/s")
+        try: self._set_params(max_speed_dps=max(0.1, float(value))); self._log(f"Max speed={self.max_speed_dps} deg/s", logging.DEBUG)
         except: self._log("Invalid max speed")
 
     def osc_set_period(self, addr, value):
-        try: self.period_sec = max(0.1, float(value)); self._log(f"Period={self.period_sec} s")
+        try: self._set_params(period_sec=max(0.1, float(value))); self._log(f"Period={self.period_sec} s", logging.DEBUG)
         except: self._log("Invalid period")
 
     def osc_set_loop_hz(self, addr, value):
-        try: self.loop_hz = max(1.0, float(value)); self._log(f"Loop rate={self.loop_hz} Hz")
+        try: self._set_params(loop_hz=max(1.0, float(value))); self._log(f"Loop rate={self.loop_hz} Hz", logging.DEBUG)
         except: self._log("Invalid loop rate")
 
     def osc_set_sleep_after(self, addr, value):
-        try: self.sleep_after_s = max(0.0, float(value)); self._log(f"Sleep after={self.sleep_after_s} s")
+        try: self._set_params(sleep_after_s=max(0.0, float(value))); self._log(f"Sleep after={self.sleep_after_s} s", logging.DEBUG)
         except: self._log("Invalid sleep_after")
 
     def osc_set_sleep_at_center(self, addr, value):
-        try: self.sleep_at_center = bool(int(float(value))); self._log(f"Sleep at center={self.sleep_at_center}")
+        try: self._set_params(sleep_at_center=bool(int(float(value)))); self._log(f"Sleep at center={self.sleep_at_center}", logging.DEBUG)
         except: self._log("Invalid sleep_at_center (use 0/1)")
 
     def osc_set_disable_torque(self, addr, value):
-        try: self.disable_torque_during_sleep = bool(int(float(value))); self._log(f"Disable torque during sleep={self.disable_torque_during_sleep}")
+        try: self._set_params(disable_torque_during_sleep=bool(int(float(value)))); self._log(f"Disable torque during sleep={self.disable_torque_during_sleep}", logging.DEBUG)
         except: self._log("Invalid disable_torque (use 0/1)")
 
+    def osc_set_params(self, addr, *values):
+        # /fish/set <amp_deg> [min_dps] [max_dps] [period_s]: one packet (or one bundle
+        # element) per frame, applied together so the motor loop never sees a partial update
+        names = ("amplitude_deg", "min_speed_dps", "max_speed_dps", "period_sec")
+        try:
+            if not 1 <= len(values) <= len(names):
+                raise ValueError
+            self._set_params(**{n: max(0.1, float(v)) for n, v in zip(names, values)})
+            self._log(f"Set amp={self.amplitude_deg} min={self.min_speed_dps} "
+                      f"max={self.max_speed_dps} T={self.period_sec}", logging.DEBUG)
+        except (TypeError, ValueError):
+            self._log("Invalid /fish/set (use: amp [min max period])")
+
     def osc_save(self, *args):
         self.save_settings()
-        self._log("settings.json saved (OSC)")
+        self._log("settings.json saved (OSC)", logging.DEBUG)
 
     # ------------------- Motion control -------------------
     def _oscillation_loop(self):
-        center_units = degrees_to_dxl_units(HOME_DEGREES)
-
-        while not self._stop_evt.is_set():
-            loop_dt = 1.0 / max(self.loop_hz, 1.0)
-            phase = 0.0
-            period_start = time.monotonic()
-            amp_deg = max(self.amplitude_deg, 0.1)
-
-            while not self._stop_evt.is_set():
-                now = time.monotonic()
-                elapsed = now - period_start
-                if elapsed >= self.period_sec:
+        if pin_thread(self.motor_cpus):
+            self._log(f"Motor loop pinned to CPUs {sorted(self.motor_cpus)}")
+        if set_realtime_priority(RT_PRIORITY):
+            self._log(f"Motor loop running SCHED_FIFO priority {RT_PRIORITY}")
+        else:
+            self._log("Motor loop left at normal priority: SCHED_FIFO needs root, CAP_SYS_NICE "
+                      "or an rtprio limit (see RT_PRIORITY)", logging.WARNING)
+        set_timer_slack()  # matters when SCHED_FIFO was refused; RT threads have no slack
+        # Bind per-tick callables to locals once: no global/attribute lookups in the inner loop
+        stopped = self._stop_evt.is_set
+        stop_flag = self._stop_flag
+        monotonic_ns, wait_until = time.monotonic_ns, sleep_until
+        # _goto_units inlined: the table is already clamped, so each new goal is just a
+        # position patch, a CRC over the fixed-length prefix and a write
+        pkt = self._goal_pkt
+        crc_input = memoryview(pkt)[:GOAL_PKT_CRC_OFFSET]
+        pack_into, crc = struct.pack_into, crc16
+        write = self.port_handler.writePort
+
+        while not stopped():
+            # Snapshot parameters once per sweep: OSC/GUI updates take effect at the
+            # next period boundary and can never be seen half-applied mid-sweep
+            with self._param_lock:
+                key = self._wave_key()
+                loop_dt_ns = round(key[-1] * 1e9)  # integer ns: deadlines never drift by float rounding
+                sleep_after_s = self.sleep_after_s
+                sleep_at_center = self.sleep_at_center
+                cut_torque = self.disable_torque_during_sleep
+            ref = self._wave_ref[0]
+            if ref is not None and ref[0] == key:
+                wave = ref[1]
+            else:  # builder hasn't caught up with this change yet: build it here once
+                wave = build_waveform(*key)
+                self._wave_ref[0] = (key, wave)
+            if not wave:  # degenerate parameters: nothing to send, so don't spin at RT priority
+                if self._stop_evt.wait(key[-1]):
                     break
-
-                v_dps = speed_deg_per_sec(elapsed, self.period_sec, self.min_speed_dps, self.max_speed_dps)
-                dphase_dt = v_dps / amp_deg   # θ=A·sin(phase) → peak dθ/dt=A·dphase/dt
-
-                phase += dphase_dt * loop_dt
-                theta_deg = HOME_DEGREES + self.amplitude_deg * math.sin(phase)
-                goal_units = clamp_0_4095(degrees_to_dxl_units(theta_deg))
-                self._goto_units(goal_units)
-
-                after = time.monotonic()
-                remain = loop_dt - (after - now)
+                continue
+            next_t = monotonic_ns()
+            last_goal = None  # per sweep: torque may have been cycled since the last write
+
+            if PROFILE_MODE:
+                for goal_units, prof_vel, dur in profile_moves(wave, key[-1]):
+                    if stop_flag[0]:
+                        break
+                    self.packet_handler.write4ByteTxRx(self.port_handler, MOTOR_ID,
+                                                       ADDR_PROFILE_VELOCITY, prof_vel)
+                    self._goto_units(goal_units)
+                    next_t += round(dur * 1e9)
+                    if self._stop_evt.wait(max(0, next_t - monotonic_ns()) / 1e9):
+                        break
+                wave = ()  # swings sent: nothing left to stream
+
+            for goal_units in wave:
+                if stop_flag[0]:
+                    break
+                if goal_units != last_goal:  # slow ticks near the peaks repeat the same unit
+                    pack_into("<i", pkt, GOAL_PKT_POS_OFFSET, goal_units)
+                    pack_into("<H", pkt, GOAL_PKT_CRC_OFFSET, crc(crc_input))
+                    write(pkt)
+                    last_goal = goal_units
+
+                # Absolute deadlines: write/OSC/GC jitter doesn't accumulate into the period
+                next_t += loop_dt_ns
+                remain = next_t - monotonic_ns()
                 if remain > 0:
-                    time.sleep(remain)
+                    wait_until(next_t)
+                elif remain < -2 * loop_dt_ns:
+                    next_t = monotonic_ns()  # fell well behind: resync instead of bursting
 
-            if self._stop_evt.is_set():
+            if stopped():
                 break
 
-            if self.sleep_after_s > 0.0:
-                if self.sleep_at_center:
-                    self._goto_units(center_units)
-                    time.sleep(0.3)
+            if sleep_after_s > 0.0:
+                # Waits are on the stop event, so /fish/stop ends a long rest at once
+                # instead of after up to sleep_after_s (stop_oscillation only joins for 2 s)
+                if sleep_at_center:
+                    self._goto_units(HOME_UNITS)
+                    if self._stop_evt.wait(0.3):
+                        break
 
-                if self.disable_torque_during_sleep:
+                if cut_torque:
                     self.packet_handler.write1ByteTxRx(self.port_handler, MOTOR_ID, ADDR_TORQUE_ENABLE, TORQUE_DISABLE)
 
-                self._log(f"Sleeping {self.sleep_after_s:.2f}s…")
-                time.sleep(self.sleep_after_s)
+                self._log(f"Sleeping {sleep_after_s:.2f}s…")
+                if self._stop_evt.wait(sleep_after_s):
+                    break
 
-                if self.disable_torque_during_sleep:
+                if cut_torque:
                     self.packet_handler.write1ByteTxRx(self.port_handler, MOTOR_ID, ADDR_TORQUE_ENABLE, TORQUE_ENABLE)
                     time.sleep(0.05)
                     self._assert_motion_caps()
-                    if self.sleep_at_center:
-                        self._goto_units(center_units)
+                    if sleep_at_center:
+                        self._goto_units(HOME_UNITS)
                         time.sleep(0.2)
 
-                # Restart sweep fresh
-                phase = 0.0
-                period_start = time.monotonic()
-
-        self._goto_units(degrees_to_dxl_units(HOME_DEGREES))
+        self._goto_units(HOME_UNITS)
 
     def start_oscillation(self, *args):
         if self.running:
@@ -431,6 +846,7 @@ class SingleMotorOscillator:
         except Exception:
             pass
         self._stop_evt.clear()
+        self._stop_flag[0] = 0
         self.running = True
         self._thread = threading.Thread(target=self._oscillation_loop, daemon=True)
         self._thread.start()
@@ -440,6 +856,7 @@ class SingleMotorOscillator:
         if not self.running:
             self._log("Not running")
         else:
+            self._stop_flag[0] = 1
             self._stop_evt.set()
             if self._thread:
                 self._thread.join(timeout=2.0)
@@ -488,7 +905,7 @@ class SingleMotorOscillator:
 
     def go_home(self, *args):
         self.stop_oscillation()
-        self._goto_units(degrees_to_dxl_units(HOME_DEGREES))
+        self._goto_units(HOME_UNITS)
         self._log("Homed")
 
     def shutdown_system(self, *args):
@@ -497,19 +914,41 @@ class SingleMotorOscillator:
         self.packet_handler.write1ByteTxRx(self.port_handler, MOTOR_ID, ADDR_TORQUE_ENABLE, TORQUE_DISABLE)
         self.port_handler.closePort()
         self._stop_osc_server()
-        os.system("sudo shutdown -h now")
+        self._flush_settings(durable=True)
+        # Orderly poweroff through systemd: services stopped, filesystems unmounted.
+        # The service runs as pi, so go through sudo (-n: fail instead of prompting)
+        cmd = ["systemctl", "poweroff"]
+        if os.geteuid() != 0:
+            cmd = ["sudo", "-n"] + cmd
+        try:
+            subprocess.run(cmd, check=True, timeout=10)
+            return
+        except (OSError, subprocess.SubprocessError) as e:
+            self._log(f"{' '.join(cmd)} failed ({e}); powering off directly", logging.ERROR)
+        # Hold the settings lock so the writer thread can't start a write, and drain the log
+        if self.log_listener is not None:
+            self.log_listener.stop()
+        with self._save_lock:
+            off = power_off()
+        if self.log_listener is not None:
+            self.log_listener.start()
+        if not off:
+            self._log("Power off failed: needs root or CAP_SYS_BOOT", logging.ERROR)
 
     # ------------------- GUI wrappers -------------------
     def start_oscillation_gui(self):
         try:
-            self.amplitude_deg = float(self.var_amp.get())
-            self.min_speed_dps = float(self.var_min.get())
-            self.max_speed_dps = float(self.var_max.get())
-            self.period_sec    = float(self.var_T.get())
-            self.loop_hz       = float(self.var_loop.get())
-            self.sleep_after_s = float(self.var_sleep.get())
-            self.sleep_at_center = bool(self.var_center.get())
-            self.disable_torque_during_sleep = bool(self.var_cut.get())
+            # Same floors as the OSC setters
+            self._set_params(
+                amplitude_deg = max(0.1, float(self.var_amp.get())),
+                min_speed_dps = max(0.1, float(self.var_min.get())),
+                max_speed_dps = max(0.1, float(self.var_max.get())),
+                period_sec    = max(0.1, float(self.var_T.get())),
+                loop_hz       = max(1.0, float(self.var_loop.get())),
+                sleep_after_s = max(0.0, float(self.var_sleep.get())),
+                sleep_at_center = bool(self.var_center.get()),
+                disable_torque_during_sleep = bool(self.var_cut.get()),
+            )
         except Exception:
             messagebox.showerror("Error", "Invalid numeric values")
             return
@@ -524,11 +963,12 @@ class SingleMotorOscillator:
 
     def save_settings_gui(self):
         self.save_settings()
+        self._flush_settings(durable=True)  # the dialog below promises it's on disk
         messagebox.showinfo("Saved", "settings.json updated")
 
     # ------------------- Save settings -------------------
-    def save_settings(self, *args):
-        motion = {
+    def _motion_settings(self):
+        return {
             "amplitude_deg": self.amplitude_deg,
             "min_speed_dps": self.min_speed_dps,
             "max_speed_dps": self.max_speed_dps,
@@ -538,13 +978,38 @@ class SingleMotorOscillator:
             "sleep_at_center": self.sleep_at_center,
             "disable_torque_during_sleep": self.disable_torque_during_sleep
         }
-        save_config(self.osc_ip, self.osc_port, motion)
+
+    def save_settings(self, *args):
+        # Only flag the save; the writer thread does the disk I/O so OSC/GUI callers return at once
+        self._save_pending = True
+        self._save_evt.set()
         self._log("settings.json updated")
 
+    def _settings_writer(self):
+        while True:
+            self._save_evt.wait()
+            time.sleep(SETTINGS_WRITE_DELAY)  # let a burst of saves coalesce
+            self._save_evt.clear()
+            self._flush_settings()
+
+    def _flush_settings(self, durable=False):
+        with self._save_lock:
+            if not self._save_pending:
+                return
+            self._save_pending = False
+            # self._config mirrors settings.json; it is never re-read from disk, and a
+            # save that wouldn't change it (e.g. a fader returning to its start) is skipped
+            if build_config(self.osc_ip, self.osc_port, self._motion_settings(), self.baudrate,
+                            self._saved_motor_cpus) == self._config:
+                return
+            self._config = save_config(self.osc_ip, self.osc_port, self._motion_settings(), durable,
+                                       self.baudrate, self._saved_motor_cpus)
+
     # ------------------- Cleanup -------------------
     def cleanup(self):
         self.stop_oscillation()
         self._stop_osc_server()
+        self._flush_settings(durable=True)
         self.packet_handler.write1ByteTxRx(self.port_handler, MOTOR_ID, ADDR_TORQUE_ENABLE, TORQUE_DISABLE)
         self.port_handler.closePort()
         self._log("Cleanup complete.")
@@ -556,6 +1021,8 @@ def main():
     osc_saved = saved.get("osc", {})
     default_ip = osc_saved.get("listen_ip", DEFAULT_OSC_IP)
     default_port = int(osc_saved.get("listen_port", DEFAULT_OSC_PORT))
+    saved_cpus = saved.get("motor", {}).get("cpus")
+    default_motor_cpus = DEFAULT_MOTOR_CPUS if saved_cpus is None else ",".join(map(str, saved_cpus))
 
     parser = argparse.ArgumentParser(description="Single Motor Oscillator (deg/sec) with OSC + GUI")
     parser.add_argument("--listen-ip", default=default_ip, help="OSC listen IP")
@@ -564,7 +1031,14 @@ def main():
     parser.add_argument("--force-gui", action="store_true", help="Force GUI even if no display")
     parser.add_argument("--auto-start", action="store_true", help="Start oscillation automatically")
     parser.add_argument("--no-auto-start", action="store_true", help="Do not autostart oscillation")
+    parser.add_argument("--motor-cpus", type=parse_cpu_list, default=default_motor_cpus,
+                        help="CPUs for the motor loop, e.g. '1' or '2,3' (empty = no pinning)")
+    parser.add_argument("--osc-cpus", type=parse_cpu_list, default=DEFAULT_OSC_CPUS,
+                        help="CPUs for the OSC server threads (empty = no pinning)")
+    parser.add_argument("--log-level", default="INFO",
+                        help="DEBUG also logs every OSC parameter change (default: INFO)")
     args = parser.parse_args()
+    log_listener = setup_logging(args.log_level)
 
     auto_start = True
     if args.no_auto_start:
@@ -582,23 +1056,35 @@ def main():
         use_gui = is_display_connected()
 
     try:
+        root = None
         if use_gui:
-            root = tk.Tk()
-            app = SingleMotorOscillator(root, args.listen_ip, args.listen_port, auto_start=auto_start)
+            load_tk()
+            try:
+                root = tk.Tk()
+            except tk.TclError as e:
+                log.warning(f"Cannot open display ({e}); running headless")
+        if root is not None:
+            app = SingleMotorOscillator(root, args.listen_ip, args.listen_port, auto_start=auto_start,
+                                        motor_cpus=args.motor_cpus, osc_cpus=args.osc_cpus,
+                                        log_listener=log_listener)
             root.protocol("WM_DELETE_WINDOW", lambda: (app.cleanup(), root.destroy()))
             root.mainloop()
         else:
-            app = SingleMotorOscillator(None, args.listen_ip, args.listen_port, auto_start=auto_start)
+            app = SingleMotorOscillator(None, args.listen_ip, args.listen_port, auto_start=auto_start,
+                                        motor_cpus=args.motor_cpus, osc_cpus=args.osc_cpus,
+                                        log_listener=log_listener)
             try:
                 while True:
                     time.sleep(1)
             except KeyboardInterrupt:
-                print("\nShutting down…")
+                log.info("Shutting down…")
             finally:
                 app.cleanup()
     except Exception as e:
-        print(f"Error: {e}")
+        log.error(f"Error: {e}")
         sys.exit(1)
+    finally:
+        log_listener.stop()
 
 
 if __name__ == "__main__":
@@ -1,10 +1,8 @@
 #!/usr/bin/env python3
 import time
 import math
-import tkinter as tk
-import threading
-from dynamixel_sdk import *  # Uses Dynamixel SDK library
-import python
+from dynamixel_sdk import PortHandler, PacketHandler, GroupSyncWrite, COMM_SUCCESS
+from dxl_port import set_async_low_latency, set_ftdi_latency, sleep_until
 
 # ==================== USER SETTINGS ====================
 PORT                 = "/dev/tty.usbserial-FTA7NN86"
@@ -30,13 +28,15 @@ DISABLE_TORQUE_DURING_SLEEP = True
 
 # Dynamixel Control Table (Protocol 2.0)
 ADDR_TORQUE_ENABLE = 64
+ADDR_RETURN_DELAY_TIME = 9   # EEPROM; 2 µs/unit, factory default 250 = 500 µs
 ADDR_GOAL_POSITION = 116
 TORQUE_ENABLE      = 1
 TORQUE_DISABLE     = 0
 
+_DEG2U = 4095 / 360.0  # DXL position units per degree
+
 def degrees_to_dxl_units(deg: float) -> int:
-    deg = (deg % 360.0)
-    return int(deg / 360.0 * 4095)
+    return int((deg % 360.0) * _DEG2U)
 
 def clamp_0_4095(x: int) -> int:
     return 0 if x < 0 else (4095 if x > 4095 else x)
@@ -47,9 +47,22 @@ def speed_deg_per_sec(elapsed: float) -> float:
     phi = 2.0 * math.pi * (elapsed / PERIOD_SEC)
     return MIN_SPEED_DPS + (MAX_SPEED_DPS - MIN_SPEED_DPS) * 0.5 * (1.0 - math.cos(phi))
 
+def build_waveform(loop_dt: float) -> list:
+    """Goal positions (DXL units) for one sweep, one per control tick: the phase is
+    integrated once here, so the control loop only walks the list."""
+    amp_deg = max(AMPLITUDE_DEG, 0.1)
+    phase = 0.0
+    wave = []
+    for k in range(math.ceil(PERIOD_SEC / loop_dt)):
+        v_dps = speed_deg_per_sec(k * loop_dt)
+        phase += v_dps / amp_deg * loop_dt  # rad/s · s
+        wave.append(clamp_0_4095(degrees_to_dxl_units(HOME_DEGREES + AMPLITUDE_DEG * math.sin(phase))))
+    return wave
+
 def main():
     loop_dt = 1.0 / max(LOOP_HZ, 1.0)
-    amp_deg = max(AMPLITUDE_DEG, 0.1)
+    loop_dt_ns = round(loop_dt * 1e9)  # integer ns: deadlines never drift by float rounding
+    wave = build_waveform(loop_dt)  # settings are constants: every sweep is identical
 
     ph = PortHandler(PORT)
     pk = PacketHandler(PROTOCOL_VERSION)
@@ -57,6 +70,15 @@ def main():
         raise RuntimeError(f"Failed to open port {PORT}")
     if not ph.setBaudRate(BAUDRATE):
         raise RuntimeError(f"Failed to set baudrate {BAUDRATE}")
+    # Default FTDI latency timer is 16 ms: every goal would sit in the adapter that long
+    if set_ftdi_latency(PORT) | set_async_low_latency(ph.ser.fileno()):
+        print("Serial port set to low latency")
+
+    # Return Delay Time is EEPROM: only write it when it isn't 0 yet, with torque off
+    rdt, comm, _ = pk.read1ByteTxRx(ph, MOTOR_ID, ADDR_RETURN_DELAY_TIME)
+    if comm != COMM_SUCCESS or rdt != 0:
+        pk.write1ByteTxRx(ph, MOTOR_ID, ADDR_TORQUE_ENABLE, TORQUE_DISABLE)
+        pk.write1ByteTxRx(ph, MOTOR_ID, ADDR_RETURN_DELAY_TIME, 0)
 
     pk.write1ByteTxRx(ph, MOTOR_ID, ADDR_TORQUE_ENABLE, TORQUE_ENABLE)
     center_units = degrees_to_dxl_units(HOME_DEGREES)
@@ -64,32 +86,26 @@ def main():
     pk.write4ByteTxRx(ph, MOTOR_ID, ADDR_GOAL_POSITION, center_units)
     time.sleep(0.3)
 
+    # Per-tick goals go out as a broadcast SyncWrite: no status packet to wait for
+    goal_writer = GroupSyncWrite(ph, pk, ADDR_GOAL_POSITION, 4)
+    goal_writer.addParam(MOTOR_ID, list(center_units.to_bytes(4, "little")))
+
     print("Running continuous sinusoid (Ctrl+C to stop).")
 
     try:
         while True:
-            period_start = time.monotonic()
-            phase = 0.0
-
-            while True:
-                now = time.monotonic()
-                elapsed = now - period_start
-                if elapsed >= PERIOD_SEC:
-                    break
-
-                v_dps = speed_deg_per_sec(elapsed)
-                dphase_dt = v_dps / amp_deg  # rad/s
-
-                phase += dphase_dt * loop_dt
-
-                theta_deg = HOME_DEGREES + AMPLITUDE_DEG * math.sin(phase)
-                goal_units = clamp_0_4095(degrees_to_dxl_units(theta_deg))
-                pk.write4ByteTxRx(ph, MOTOR_ID, ADDR_GOAL_POSITION, goal_units)
-
-                after = time.monotonic()
-                sleep_remain = loop_dt - (after - now)
-                if sleep_remain > 0:
-                    time.sleep(sleep_remain)
+            next_t = time.monotonic_ns()
+
+            for goal_units in wave:
+                goal_writer.changeParam(MOTOR_ID, list(goal_units.to_bytes(4, "little")))
+                goal_writer.txPacket()
+
+                # Absolute deadlines: write/sleep jitter doesn't accumulate into the period
+                next_t += loop_dt_ns
+                if next_t < time.monotonic_ns() - 2 * loop_dt_ns:
+                    next_t = time.monotonic_ns()  # fell well behind: resync instead of bursting
+                else:
+                    sleep_until(next_t)
 
             # ---- END OF SWEEP ----
             if SLEEP_AFTER_PERIOD_SEC > 0.0:
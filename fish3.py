@@ -1,24 +1,60 @@
+import os
 import time
 import math
+import struct
 import tkinter as tk
 import threading
-from dynamixel_sdk import *  # Uses Dynamixel SDK library
+from dynamixel_sdk import PortHandler, PacketHandler
+from dxl_port import (BROADCAST_ID, INST_SYNC_WRITE, PACKET_HEADER, crc16, set_async_low_latency,
+                      set_ftdi_latency, set_realtime_priority, sleep_until)
 
 # Constants
 PORT = "/dev/tty.usbserial-FT9HDAWY"  # Update this if needed
 BAUDRATE = 57600
 ADDR_GOAL_POSITION = 116
 ADDR_PRESENT_POSITION = 132
-ADDR_MOVING_SPEED = 112
+ADDR_PROFILE_VELOCITY = 112  # 4B
 ADDR_TORQUE_ENABLE = 64
+ADDR_PROFILE_ACCELERATION = 108
 TORQUE_ENABLE = 1
 TORQUE_DISABLE = 0
 PROTOCOL_VERSION = 2.0
 MOTOR_IDS = [1, 2, 3]
 HOME_DEGREES = 180
 
+# True: send only the two swing end points per cycle and let the servo's on-board profile
+# generator interpolate (trapezoidal, not a true sine). False: stream the stepped sine.
+PROFILE_MODE = False
+PROF_ACC_UNITS = 100           # 214.577 rev/min² per unit
+VELOCITY_UNIT_DPS = 0.229 * 6  # one Profile Velocity unit (0.229 rpm) in deg/s
+
+FINE_NS = 300_000  # last slice before a deadline: one absolute sleep, Event.wait overshoots
+# SCHED_FIFO priority for the oscillation thread. Needs root or an rtprio limit, e.g.
+# "pi - rtprio 99" in /etc/security/limits.conf; stays SCHED_OTHER (with a warning) otherwise.
+RT_PRIORITY = 20
+
+_DEG2U = 4095 / 360.0  # DXL position units per degree
+
 def degrees_to_dxl_units(degrees):
-    return int((degrees / 360.0) * 4095)
+    return int(degrees * _DEG2U)
+
+# Protocol 2.0 SyncWrite of GOAL_POSITION, one id + position per motor:
+# FF FF FD 00 | FE | LEN=7+5n | 83 | addr(2) | data len(2) | (id | position(4))×n | CRC(2)
+def goal_packet(goals):
+    """Complete SyncWrite GOAL_POSITION packet, CRC included, moving every motor in
+    `goals` ((motor_id, position) pairs) at once."""
+    pkt = struct.pack("<4sBHBHH", PACKET_HEADER, BROADCAST_ID, 7 + 5 * len(goals),
+                      INST_SYNC_WRITE, ADDR_GOAL_POSITION, 4)
+    pkt += b"".join(struct.pack("<Bi", mid, pos) for mid, pos in goals)
+    return pkt + struct.pack("<H", crc16(pkt))
+
+def wait_until(deadline_ns, stop):
+    """sleep_until that returns True as soon as `stop` is set."""
+    remain = deadline_ns - time.monotonic_ns()
+    if remain > FINE_NS and stop.wait((remain - FINE_NS) * 1e-9):
+        return True
+    sleep_until(deadline_ns)
+    return False
 
 class MultiMotorOscillator:
     def __init__(self, root):
@@ -30,10 +66,24 @@ class MultiMotorOscillator:
 
         if not self.port_handler.openPort() or not self.port_handler.setBaudRate(BAUDRATE):
             raise Exception("Failed to open port or set baudrate!")
+        # Default FTDI latency timer is 16 ms: every goal would sit in the adapter that long
+        if set_ftdi_latency(PORT) | set_async_low_latency(self.port_handler.ser.fileno()):
+            print("Serial port set to low latency")
+
+        # Goal positions go out as broadcast SyncWrite packets, so the motors send no status
+        # packet; the oscillation table carries them fully built (see goal_packet)
+        self.port_lock = threading.Lock()  # one bus shared by the oscillation thread and the GUI
+        # Goal packets go straight to the tty fd; pyserial's write() wrapper is only
+        # needed when the kernel tx buffer is full
+        self.port_fd = self.port_handler.ser.fileno()
+        self.last_pos = {mid: None for mid in MOTOR_IDS}  # last goal sent, to skip repeats
 
         # Enable torque and set zero for all motors
         self.zero_pos = {}
-        self.running = {mid: False for mid in MOTOR_IDS}
+        self._stop = threading.Event()  # set = the oscillation thread exits promptly, even mid-wait
+        self._stop.set()
+        self._thread = None
+        self.set_amplitude(30.0)
 
         for motor_id in MOTOR_IDS:
             self.packet_handler.write1ByteTxRx(self.port_handler, motor_id, ADDR_TORQUE_ENABLE, TORQUE_ENABLE)
@@ -42,7 +92,7 @@ class MultiMotorOscillator:
         # GUI
         tk.Label(root, text="Amplitude (degrees):").pack()
         self.amplitude_entry = tk.Entry(root)
-        self.amplitude_entry.insert(0, "30")
+        self.amplitude_entry.insert(0, f"{self.amplitude_deg:g}")
         self.amplitude_entry.pack()
 
         tk.Label(root, text="Speed (steps/sec):").pack()
@@ -60,10 +110,34 @@ class MultiMotorOscillator:
         self.log.pack(pady=10)
 
     def move_to_position(self, motor_id, position):
-        self.packet_handler.write4ByteTxRx(self.port_handler, motor_id, ADDR_GOAL_POSITION, position)
+        self.send_goals(((motor_id, position),))
+
+    def send_goals(self, goals, pkt=None):
+        """Move the motors in `goals` ((motor_id, position) pairs) with one SyncWrite packet."""
+        # Sine peaks repeat the same integer goals; don't spend bus time re-sending them
+        last_pos = self.last_pos
+        if all(last_pos[mid] == pos for mid, pos in goals):
+            return
+        for mid, pos in goals:
+            last_pos[mid] = pos
+        if pkt is None:
+            pkt = goal_packet(goals)
+        with self.port_lock:
+            try:
+                n = os.write(self.port_fd, pkt)
+            except BlockingIOError:
+                n = 0
+            if n < len(pkt):
+                self.port_handler.writePort(pkt[n:])  # let pyserial wait out a full tx buffer
+
+    def set_amplitude(self, amplitude_deg):
+        # Keep the DXL-unit amplitude cached next to the degrees so the oscillation
+        # setup reads a plain attribute instead of converting on every start
+        self.amplitude_deg = amplitude_deg
+        self.amplitude_units = degrees_to_dxl_units(amplitude_deg)
 
     def set_speed(self, motor_id, speed):
-        self.packet_handler.write2ByteTxRx(self.port_handler, motor_id, ADDR_MOVING_SPEED, speed)
+        self.packet_handler.write4ByteTxRx(self.port_handler, motor_id, ADDR_PROFILE_VELOCITY, speed)
 
     def start_oscillation(self):
         try:
@@ -77,38 +151,88 @@ class MultiMotorOscillator:
             self.log.insert(tk.END, "Amplitude and speed must be positive.\n")
             return
 
-        amplitude_units = degrees_to_dxl_units(amplitude_deg)
+        if amplitude_deg != self.amplitude_deg:
+            self.set_amplitude(amplitude_deg)
+        amplitude_units = self.amplitude_units
 
         steps = 20
+        # One half-swing of the sine as integer offsets, computed once per start instead of
+        # every tick. round() (not int()) keeps the forward and backward swings symmetric.
+        offsets = tuple(round(amplitude_units * math.sin((i / steps) * math.pi)) for i in range(steps + 1))
+        dt = 1 / (speed * 10)
+        if PROFILE_MODE:
+            # One goal per half-swing, spaced as long as the stepped half-swing takes; the
+            # profile velocity covers the 2·amplitude travel in that time
+            dt *= steps + 1
+            prof_vel = math.ceil(2 * amplitude_deg / dt / VELOCITY_UNIT_DPS)
+            offsets = (amplitude_units,)
+
+        # A previous run's thread must be gone before clearing _stop, or it would resume;
+        # stopping it first also keeps it off the bus while the registers below are written
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
         for motor_id in MOTOR_IDS:
-            self.set_speed(motor_id, speed)
-            self.running[motor_id] = True
-
-            def oscillate(mid=motor_id):  # Use default arg to lock motor_id in thread
-                while self.running[mid]:
-                    for direction in [1, -1]:
-                        for i in range(steps + 1):
-                            if not self.running[mid]:
-                                return
-                            sine_value = math.sin((i / steps) * math.pi)
-                            position = int(self.zero_pos[mid] + direction * amplitude_units * sine_value)
-                            self.move_to_position(mid, position)
-                            time.sleep(1 / (speed * 10))
-                self.move_to_position(mid, self.zero_pos[mid])
-
-            threading.Thread(target=oscillate, daemon=True).start()
+            if PROFILE_MODE:
+                self.packet_handler.write4ByteTxRx(self.port_handler, motor_id, ADDR_PROFILE_ACCELERATION, PROF_ACC_UNITS)
+                self.packet_handler.write4ByteTxRx(self.port_handler, motor_id, ADDR_PROFILE_VELOCITY, prof_vel)
+            else:
+                self.set_speed(motor_id, speed)
+
+        # All motors swing in step, so each tick is one SyncWrite carrying every motor's
+        # goal: one packet on the bus instead of one per motor. Each tick's goals are
+        # paired with the finished packet, so the loop does no packing or CRC per tick.
+        ticks = []
+        for sign in (1, -1):  # forward and backward half-swings
+            for off in offsets:
+                goals = tuple((mid, self.zero_pos[mid] + sign * off) for mid in MOTOR_IDS)
+                ticks.append((goals, goal_packet(goals)))
+        ticks = tuple(ticks)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.oscillate, args=(ticks, round(dt * 1e9)), daemon=True)
+        self._thread.start()
 
         self.log.insert(tk.END, "Oscillation started for motors 1, 2, 3.\n")
 
+    def oscillate(self, ticks, dt_ns):
+        if not set_realtime_priority(RT_PRIORITY):
+            print("[WARN] Oscillation left at normal priority (SCHED_FIFO needs root or an rtprio limit)")
+        # Integer nanosecond deadlines: exact adds, no float drift over long runs
+        next_t = time.monotonic_ns()
+        # Bind loop invariants to locals: no attribute lookups per tick
+        stop = self._stop
+        stopped = stop.is_set
+        send = self.send_goals
+        now = time.monotonic_ns
+        wait = wait_until
+        while not stopped():
+            for goals, pkt in ticks:
+                if stopped():
+                    return
+                send(goals, pkt)
+                # Absolute deadlines so write/sleep overhead doesn't accumulate as drift
+                next_t += dt_ns
+                if next_t < now():
+                    next_t = now()  # missed a tick: resync instead of bursting
+                elif wait(next_t, stop):
+                    return
+
     def stop_oscillation(self):
-        for motor_id in MOTOR_IDS:
-            self.running[motor_id] = False
-            self.move_to_position(motor_id, self.zero_pos[motor_id])
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()  # its last goal must not land after the home position
+            self._thread = None
+        self.send_goals(tuple((mid, self.zero_pos[mid]) for mid in MOTOR_IDS))
         self.log.insert(tk.END, "Oscillation stopped for all motors.\n")
 
     def cleanup(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()  # no goal write may race the torque-off or hit a closed fd
+            self._thread = None
         for motor_id in MOTOR_IDS:
-            self.running[motor_id] = False
             self.packet_handler.write1ByteTxRx(self.port_handler, motor_id, ADDR_TORQUE_ENABLE, TORQUE_DISABLE)
         self.port_handler.closePort()
         print("Cleanup complete.")
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 import tkinter as tk
-from pythonosc.udp_client import SimpleUDPClient
-import time, json, os, threading
+import time, json, os, sys, threading, socket, struct
+try:
+    import orjson  # optional, parses the float-heavy dance files several times faster
+except ImportError:
+    orjson = None
 
 # ------------- NETWORK CONFIG -------------
 FISH_LIST = [
@@ -11,10 +14,14 @@ FISH_LIST = [
 ]
 NUM_FISH = 3
 HOME_DEG = 180.0
+DXL_UNITS_PER_DEG = 4095 / 360.0     # the Pis' degrees_to_dxl_units: ~0.088° per unit
 
 # ------------- STREAMING CONFIG -------------
-STREAM_HZ = 10.0                     # set to the Hz your JSON was authored at
-TICK_SEC  = 1.0 / STREAM_HZ
+STREAM_HZ = 10.0                     # frames per second sent; dances declaring another "hz" are resampled
+TICK_NS   = round(1e9 / STREAM_HZ)   # integer ns: deadlines never drift by float rounding
+# SCHED_FIFO priority for the dance sender thread (Linux). Needs root/CAP_SYS_NICE or an
+# rtprio limit in /etc/security/limits.conf; otherwise the thread stays SCHED_OTHER.
+RT_PRIORITY = 10
 
 # ------------- DANCE ORDER & SLEEPS -------------
 # Each tuple: (filename, sleep_after_sec)
@@ -27,8 +34,31 @@ DANCE_SEQUENCE = [
 ]
 # ------------------------------------------------
 
-# Create OSC clients
-clients = [SimpleUDPClient(ip, port) for ip, port in FISH_LIST]
+# Windows wakes sleepers on a ~15.6 ms tick by default; ask for 1 ms while we run
+_winmm = None
+if sys.platform == "win32":
+    import ctypes
+    _winmm = ctypes.WinDLL("winmm")
+    _winmm.timeBeginPeriod(1)
+
+# One connected UDP socket per fish (same order as FISH_LIST): the kernel keeps the
+# route, send() passes no address, and non-blocking means a full send buffer raises
+# instead of stalling the sender thread or the UI
+SNDBUF_BYTES = 1 << 20
+
+def open_fish_sender(addr):
+    """Returns the send function for one fish's socket."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SNDBUF_BYTES)
+    s.setblocking(False)
+    try:
+        s.connect(addr)
+        return s.send
+    except OSError as e:  # no route yet (not on the fish network): address every send
+        print(f"[WARN] connect {addr[0]}:{addr[1]} failed ({e}); sending unconnected")
+        return lambda dgram: s.sendto(dgram, addr)
+
+senders = [open_fish_sender(addr) for addr in FISH_LIST]
 
 # Tk app
 root = tk.Tk()
@@ -38,70 +68,155 @@ root.resizable(False, False)
 
 # ---- UI-safe status setter (thread-safe) ----
 def ui_status(msg, color="black"):
-    root.after(0, lambda: (status_label.config(text=msg, fg=color)))
+    def apply():
+        # Runs on the Tk thread, so comparing with what the label shows can't race
+        if status_label.cget("text") != msg or status_label.cget("fg") != color:
+            status_label.config(text=msg, fg=color)  # else already showing: skip the relayout
+    root.after(0, apply)
 
 # State
 basic_running = False          # /fish/start mode on Pis
 sender_thread = None
 stop_flag = threading.Event()
 
-# dance state protected by GIL (simple types)
-dances = []                    # loaded dances: list of dicts {frames: List[List[deg]], "hz": (optional)}
-dance_idx = 0                  # which dance file in the sequence
-frame_idx = 0                  # which frame within the current dance
-sleep_until = 0.0              # absolute monotonic time to end a between-dance sleep
-cooling = False                # true only during the cooling/sleep window
+# loaded dances: list of dicts (see load_one_dance); replaced only while no sender runs
+dances = []
 
 # ---------- Helpers ----------
+# The Pis only take OSC messages with no argument or one float32, so encode them
+# here directly instead of going through pythonosc's generic message builder
+def osc_string(s):
+    """OSC string: UTF-8, NUL-terminated, zero-padded to a multiple of 4 bytes."""
+    b = s.encode() + b"\0"
+    return b + b"\0" * (-len(b) % 4)
+
+pack_float = struct.Struct(">f").pack
+
+def osc_dgram(path, arg=None):
+    if arg is None:
+        return osc_string(path) + osc_string(",")
+    return osc_string(path) + osc_string(",f") + pack_float(float(arg))
+
+# /fish/angle <float>: address and type tag never change, so encode them once and
+# append the big-endian float per send
+ANGLE_PREFIX = osc_string("/fish/angle") + osc_string(",f")
+
+# Argument-less commands never change: encode them once
+COMMAND_DGRAMS = {path: osc_dgram(path) for path in ("/fish/start", "/fish/stop")}
+
 def send_all(path, arg=None):
-    for c in clients:
+    dgram = COMMAND_DGRAMS.get(path) if arg is None else None
+    if dgram is None:
+        dgram = osc_dgram(path, arg)
+    for send in senders:
         try:
-            c.send_message(path, arg)
-        except Exception as e:
+            send(dgram)
+        except OSError as e:
             print(f"Send {path} failed: {e}")
 
-def send_angles_frame(frame):
+def encode_frame(frame):
     """
-    frame: list-like of length NUM_FISH (deg for fish1, fish2, fish3)
+    frame: NUM_FISH angles (deg for fish1, fish2, fish3)
+    Returns the /fish/angle datagram for each fish.
     """
-    if not isinstance(frame, (list, tuple)) or len(frame) < NUM_FISH:
-        frame = [HOME_DEG] * NUM_FISH
-    for i, c in enumerate(clients):
+    return tuple(ANGLE_PREFIX + pack_float(deg) for deg in frame)
+
+def encode_dance(frames):
+    """
+    Per frame, the (fish index, /fish/angle datagram) pairs to send. The first frame
+    goes to every fish; after that a fish only gets a message when its angle maps to a
+    different motor position, so held angles (and changes finer than one position unit)
+    cost no sends (or torque re-enables on the Pi).
+    """
+    out = []
+    prev = (None,) * NUM_FISH
+    for row in frames:
+        units = tuple(int((deg % 360.0) * DXL_UNITS_PER_DEG) for deg in row)
+        dgrams = encode_frame(row)
+        out.append(tuple((i, dgrams[i]) for i in range(NUM_FISH) if units[i] != prev[i]))
+        prev = units
+    return out
+
+def send_angles_frame(sends):
+    """
+    sends: (fish index, encoded /fish/angle message) pairs (see encode_dance)
+    """
+    for i, dgram in sends:
         try:
-            c.send_message("/fish/angle", float(frame[i]))
-        except Exception as e:
+            senders[i](dgram)
+        except OSError as e:
             print(f"Angle send failed (fish{i+1}): {e}")
 
+def resample_frames(frames, src_hz, dst_hz):
+    """
+    Linearly resample frames authored at src_hz to dst_hz, once at load, so the
+    sender always streams one stored frame per tick at STREAM_HZ.
+    """
+    last = len(frames) - 1
+    step = src_hz / dst_hz  # source frames per output tick
+    out = []
+    for k in range(max(1, round(len(frames) / step))):
+        t = k * step
+        i = int(t)
+        if i >= last:
+            out.append(frames[last])
+            continue
+        f = t - i
+        out.append(tuple(a + (b - a) * f for a, b in zip(frames[i], frames[i + 1])))
+    return out
+
 def load_one_dance(path):
     """
-    Returns dict: {"frames": [[deg1,deg2,deg3], ...], "hz": optional}
+    Returns dict: {"frames": [(deg1,deg2,deg3), ...], "sends": encode_dance(frames), "hz": authored rate}
+    Frames are resampled to STREAM_HZ if the file declares a different rate.
     Raises Exception on hard failure.
     """
-    with open(path, "r") as f:
-        data = json.load(f)
+    with open(path, "rb") as f:
+        raw = f.read()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
 
     if isinstance(data, dict) and "frames" in data:
         frames = data["frames"]
-        _hz = float(data.get("hz", STREAM_HZ))
+        # "motor_freq_hz" is what the angle_frames_v1 exporter writes
+        _hz = float(data.get("hz", data.get("motor_freq_hz", STREAM_HZ)))
     else:
         frames = data
         _hz = STREAM_HZ
 
+    # One map(float) per row, padded from a shared HOME row; rows are tuples so a
+    # dance is immutable once loaded
+    home_row = (HOME_DEG,) * NUM_FISH
     clean = []
     for fr in frames:
         if not isinstance(fr, (list, tuple)):
             continue
-        row = list(fr[:NUM_FISH]) + [HOME_DEG] * max(0, NUM_FISH - len(fr))
         try:
-            row = [float(x) for x in row]
+            row = tuple(map(float, fr[:NUM_FISH]))
         except Exception:
-            row = [HOME_DEG] * NUM_FISH
-        clean.append(row)
+            row = home_row
+        clean.append(row + home_row[len(row):])
 
     if not clean:
         raise ValueError(f"No valid frames in {path}")
-
-    return {"frames": clean, "hz": _hz}
+    if _hz > 0 and _hz != STREAM_HZ:
+        clean = resample_frames(clean, _hz, STREAM_HZ)
+
+    # Encode every frame now so streaming only does sendto
+    return {"frames": clean, "sends": encode_dance(clean), "hz": _hz}
+
+# Parsed + encoded dances keyed by path, reused while the file's mtime is unchanged,
+# so pressing Start Dance again doesn't re-parse and re-encode every JSON file.
+# Entries are never mutated once loaded.
+_dance_cache = {}
+
+def load_dance_cached(path):
+    mtime = os.stat(path).st_mtime_ns
+    cached = _dance_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    d = load_one_dance(path)
+    _dance_cache[path] = (mtime, d)
+    return d
 
 def load_all_dances():
     """Loads all dances listed in DANCE_SEQUENCE into global 'dances'."""
@@ -111,13 +226,22 @@ def load_all_dances():
     for fname, _sleep in DANCE_SEQUENCE:
         path = os.path.join(base_dir, fname)
         try:
-            d = load_one_dance(path)
+            d = load_dance_cached(path)
             dances.append(d)
             print(f"[Loaded] {fname}: {len(d['frames'])} frames (hz={d.get('hz', STREAM_HZ)})")
         except Exception as e:
             print(f"[ERROR] Failed to load {fname}: {e}")
             # placeholder "hold-home" dance
-            dances.append({"frames": [[HOME_DEG]*NUM_FISH]*int(STREAM_HZ*2), "hz": STREAM_HZ})
+            frames = [(HOME_DEG,) * NUM_FISH] * int(STREAM_HZ*2)
+            dances.append({"frames": frames, "sends": encode_dance(frames), "hz": STREAM_HZ})
+
+def set_realtime_priority(priority=RT_PRIORITY):
+    """Switch the calling thread to SCHED_FIFO. Returns False where unsupported/not permitted."""
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        return True
+    except (AttributeError, OSError):  # macOS/Windows, or missing CAP_SYS_NICE
+        return False
 
 # ---------- Basic Oscillation (Pis handle their own sine) ----------
 def start_basic_osc():
@@ -138,7 +262,7 @@ def start_dance():
     Start streaming angles from JSON files at STREAM_HZ in a dedicated thread,
     with sleeps (cooling) between dances, looping the sequence until STOP.
     """
-    global sender_thread, basic_running, dance_idx, frame_idx, sleep_until, cooling
+    global sender_thread, basic_running
 
     if sender_thread and sender_thread.is_alive():
         ui_status("Dance already running.", "blue")
@@ -148,11 +272,6 @@ def start_dance():
         basic_running = False
 
     load_all_dances()
-
-    dance_idx = 0
-    frame_idx = 0
-    sleep_until = 0.0
-    cooling = False
     stop_flag.clear()
 
     sender_thread = threading.Thread(target=_dance_loop, daemon=True)
@@ -162,56 +281,49 @@ def start_dance():
 def _dance_loop():
     """
     Tight-timed streaming loop (separate thread).
-    Sends frames at precise STREAM_HZ using time.monotonic().
+    Sends frames at precise STREAM_HZ using time.monotonic_ns() deadlines.
     Between dances: sends /fish/stop once, then sends NO angles until sleep ends.
+    The sequence position lives in locals, so the loop reads top to bottom.
     """
-    global dance_idx, frame_idx, sleep_until, cooling
-
-    next_t = time.monotonic()
-    while not stop_flag.is_set():
-        now = time.monotonic()
-        # pacing
-        if now < next_t:
-            time.sleep(max(0.0005, next_t - now))
-            continue
-        next_t += TICK_SEC
-
-        # Sleep/cooling window?
-        if sleep_until > 0.0:
-            if now >= sleep_until:
-                # sleep complete → advance to next dance
-                sleep_until = 0.0
-                cooling = False
-                frame_idx = 0
-                dance_idx = (dance_idx + 1) % len(DANCE_SEQUENCE)
-                ui_status(f"🔁 Starting next dance ({dance_idx+1}/{len(DANCE_SEQUENCE)})", "green")
-                # fall-through to stream first frame this tick
-            else:
-                # During cooling: DO NOT SEND ANY ANGLES (keep torque off)
-                continue
-
-        if not dances:
-            # nothing loaded; idle (no angles to avoid re-enabling torque)
-            continue
-
-        current = dances[dance_idx]
-        frames = current["frames"]
-
-        # End of this dance → send stop once and start timed cooling
-        if frame_idx >= len(frames):
-            if not cooling:
-                cooling = True
-                sleep_sec = float(DANCE_SEQUENCE[dance_idx][1])
-                send_all("/fish/stop", None)  # torque off exactly once
-                ui_status(f"😴 Cooling motors for {sleep_sec:.0f}s…", "blue")
-                sleep_until = time.monotonic() + max(0.0, sleep_sec)
-            # no angles during sleep
-            continue
-
-        # Stream current frame (this implicitly re-enables torque)
-        frame = frames[frame_idx]
-        send_angles_frame(frame)
-        frame_idx += 1
+    if not set_realtime_priority():
+        print("[WARN] Dance sender left at normal priority (SCHED_FIFO unavailable)")
+    if not dances:
+        return  # nothing loaded: send no angles, which would re-enable torque
+
+    # Bind everything the tick touches to locals: no global/attribute lookups per frame
+    wait = stop_flag.wait
+    monotonic_ns = time.monotonic_ns
+    send_frame = send_angles_frame
+    tick = TICK_NS
+    dance_idx = 0
+    next_t = monotonic_ns()
+    while True:
+        for sends in dances[dance_idx]["sends"]:
+            # pacing: one wait per tick, straight to the deadline; STOP wakes it immediately
+            if wait(max(0, next_t - monotonic_ns()) / 1e9):
+                return
+            next_t += tick
+            now = monotonic_ns()
+            if next_t < now - 2 * tick:
+                next_t = now  # fell well behind (stall, laptop sleep): resync instead of bursting
+            # Stream current frame (this implicitly re-enables torque). Each dance starts
+            # with a full frame, so fish are re-addressed after every cooling /fish/stop.
+            send_frame(sends)
+
+        # End of this dance (one tick after its last frame) → send stop once and cool
+        if wait(max(0, next_t - monotonic_ns()) / 1e9):
+            return
+        sleep_sec = float(DANCE_SEQUENCE[dance_idx][1])
+        send_all("/fish/stop", None)  # torque off exactly once
+        ui_status(f"😴 Cooling motors for {sleep_sec:.0f}s…", "blue")
+        # During cooling: DO NOT SEND ANY ANGLES (keep torque off)
+        if wait(max(0.0, sleep_sec)):
+            return
+
+        # sleep complete → advance to next dance, first frame right away
+        next_t = monotonic_ns()
+        dance_idx = (dance_idx + 1) % len(DANCE_SEQUENCE)
+        ui_status(f"🔁 Starting next dance ({dance_idx+1}/{len(DANCE_SEQUENCE)})", "green")
 
 def stop_all():
     """
@@ -232,6 +344,8 @@ def on_close():
     try:
         stop_all()
     finally:
+        if _winmm is not None:
+            _winmm.timeEndPeriod(1)
         root.destroy()
 
 # ---------- UI ----------